@@ -1,36 +1,17 @@
-import librosa
 import numpy as np
 
-import re
-from num2words import num2words
-
 from wrapper.constants import DEFAULT_SAMPLE_RATE, DEFAUL_OUTPUT_FILE_NAME
 
 from wrapper.model import XTTSWrapper
-
-
-def normalize_numbers(text: str):
-    """Normalizes numbers in text to their textual representation.
-    """
-
-    # Define patterns for different types of numbers
-    patterns = [
-        # Cardinal numbers (1, 2, 3, ...)
-        (r"(\d+)", lambda m: num2words(int(m.group(1)), lang='vi')),
-        # Decimal numbers (1.5, 2.7, ...)
-        (r"(\d+)\.(\d+)", lambda m: num2words(float(m.group(0)), lang='vi')),
-    ]
-
-    # Apply patterns sequentially
-    for pattern, replacement_func in patterns:
-        text = re.sub(pattern, replacement_func, text)
-
-    return text
+from wrapper import helper as wrapper_helper
+from wrapper.helper import normalize_numbers
 
 
 def trim_silence(audio_data, sr, threshold=0.01, frame_length=2048, hop_length=512, keep_silence_duration=0.8):
     """Trims silence from the end of an audio signal, keeping some silence.
 
+    Same as wrapper.helper.trim_silence, but keeps 0.8 seconds of silence by default.
+
     Args:
         audio_data: The audio signal as a NumPy array.
         sr: The sample rate of the audio signal.
@@ -43,24 +24,9 @@ def trim_silence(audio_data, sr, threshold=0.01, frame_length=2048, hop_length=5
         The trimmed audio signal as a NumPy array.
     """
 
-    # Compute the RMS energy of the audio signal.
-    rms = librosa.feature.rms(
-        y=audio_data, frame_length=frame_length, hop_length=hop_length)[0]
-
-    # Find the last frame where the RMS energy is above the threshold.
-    last_frame = np.where(rms > threshold)[0][-1]
-
-    # Convert the frame index to a sample index.
-    last_sample = librosa.frames_to_samples(last_frame, hop_length=hop_length)
-
-    # Calculate the number of samples to keep as silence.
-    keep_silence_samples = int(keep_silence_duration * sr)
-
-    # Adjust the last sample index to keep some silence.
-    trimmed_audio_data = audio_data[:min(
-        last_sample + keep_silence_samples, len(audio_data))]
-
-    return trimmed_audio_data
+    return wrapper_helper.trim_silence(
+        audio_data, sr, threshold=threshold, frame_length=frame_length,
+        hop_length=hop_length, keep_silence_duration=keep_silence_duration)
 
 
 def normalize_text(text: str):
@@ -109,7 +75,16 @@ def paragraph_to_audio(paragraph, wrapper: XTTSWrapper):
         # Append the trimmed audio to the list
         audio_list.append(tuned_audio)
 
-    result = np.concatenate(audio_list)
+    if not audio_list:
+        return np.zeros(0, dtype=np.float32)
+
+    # Copy each sentence into a single preallocated buffer
+    total = sum(len(audio) for audio in audio_list)
+    result = np.empty(total, dtype=audio_list[0].dtype)
+    offset = 0
+    for audio in audio_list:
+        result[offset:offset + len(audio)] = audio
+        offset += len(audio)
 
     return result
 
@@ -1,8 +1,11 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 
+import struct
+import time
+import wave
 import zipfile
 from wrapper.model import XTTSWrapper
-from wrapper.helper import paragraph_to_audio
+from wrapper.helper import paragraph_to_audio, paragraph_to_audio_stream
 from wrapper.constants import DEFAULT_SAMPLE_RATE, DEFAULT_OUTPUT_FILE_LENGTH
 
 from io import BytesIO
@@ -17,8 +20,8 @@ wrapper = XTTSWrapper(
 )
 
 
-@app.route("/paragraph_to_sentence_audios", methods=["POST"])
-def paragraph_to_sentence_audios():
+def read_text_request():
+    """Returns (text, language) from the request body, form or query string."""
     # Accept JSON; fall back to form or query string gracefully
     data = request.get_json(silent=True) or {}
     if not data and request.form:
@@ -31,15 +34,36 @@ def paragraph_to_sentence_audios():
 
     print(f"Processing text: [{text}] with language: [{language}]")
 
+    return text, language
+
+
+def no_text_response():
+    return jsonify({
+        "error": "No text provided. Send JSON with {'text': '...'}",
+        "hint": "Use header 'Content-Type: application/json'."
+    }), 400
+
+
+def streaming_wav_header(sample_rate: int):
+    """Builds a mono PCM16 WAV header for a stream of unknown length."""
+    # 0xFFFFFFFF sizes mark the RIFF and data chunks as open-ended
+    return b"".join([
+        b"RIFF", struct.pack("<I", 0xFFFFFFFF), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 1, 1,
+                             sample_rate, sample_rate * 2, 2, 16),
+        b"data", struct.pack("<I", 0xFFFFFFFF),
+    ])
+
+
+@app.route("/paragraph_to_sentence_audios", methods=["POST"])
+async def paragraph_to_sentence_audios():
+    text, language = read_text_request()
     if not text:
-        return jsonify({
-            "error": "No text provided. Send JSON with {'text': '...'}",
-            "hint": "Use header 'Content-Type: application/json'."
-        }), 400
+        return no_text_response()
 
     # Generate audios
     try:
-        audio_map = paragraph_to_audio(
+        audio_map = await paragraph_to_audio(
             wrapper, text, language)  # {name: np.ndarray[int16]}
     except Exception as e:
         return jsonify({"error": "Failed to synthesize audio", "detail": str(e)}), 500
@@ -48,8 +72,9 @@ def paragraph_to_sentence_audios():
         return jsonify({"error": "No audio generated"}), 500
 
     # Build a ZIP in memory (no disk writes)
+    # PCM audio barely compresses, so store entries instead of deflating them
     zip_buf = BytesIO()
-    with zipfile.ZipFile(zip_buf, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+    with zipfile.ZipFile(zip_buf, mode="w", compression=zipfile.ZIP_STORED) as zf:
         for audio_name, audio in audio_map.items():
             # sanitize & truncate file name
             safe_name = "".join(
@@ -57,12 +82,17 @@ def paragraph_to_sentence_audios():
             safe_name = (safe_name or "audio")[
                 :DEFAULT_OUTPUT_FILE_LENGTH] + ".wav"
 
-            # write a wav into a memory buffer
-            wav_buf = BytesIO()
-            # scipy.io.wavfile.write supports file-like objects
-            from scipy.io import wavfile
-            wavfile.write(wav_buf, DEFAULT_SAMPLE_RATE, audio)
-            zf.writestr(safe_name, wav_buf.getvalue())
+            # stream the PCM16 wav straight into the zip entry; the frame count
+            # is set up front so the header never needs to be patched (no seek)
+            info = zipfile.ZipInfo(safe_name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.external_attr = 0o600 << 16
+            with zf.open(info, "w") as entry, wave.open(entry, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(DEFAULT_SAMPLE_RATE)
+                wav.setnframes(len(audio))
+                wav.writeframes(audio)
 
     zip_buf.seek(0)
     return send_file(
@@ -74,6 +104,21 @@ def paragraph_to_sentence_audios():
     )
 
 
+@app.route("/paragraph_to_audio_stream", methods=["POST"])
+def paragraph_to_audio_stream_route():
+    text, language = read_text_request()
+    if not text:
+        return no_text_response()
+
+    # Send the header right away, then PCM16 chunks as the model produces them
+    def generate():
+        yield streaming_wav_header(DEFAULT_SAMPLE_RATE)
+        for chunk in paragraph_to_audio_stream(wrapper, text, language):
+            yield chunk.tobytes()
+
+    return Response(generate(), mimetype="audio/wav")
+
+
 @app.route("/health", methods=["GET"])
 def health():
     return "200"
@@ -9,14 +9,16 @@ and provide fallback mechanisms to prevent application crashes.
 """
 
 from .model import XTTSWrapper
-from .helper import paragraph_to_audio, normalize_text, fine_tune_audio
+from .helper import paragraph_to_audio, paragraph_to_audio_stream, normalize_text, fine_tune_audio, audio_to_pcm16
 from .constants import DEFAULT_SAMPLE_RATE, DEFAUL_OUTPUT_FILE_NAME, DEFAULT_OUTPUT_FILE_LENGTH
 
 __all__ = [
     'XTTSWrapper',
     'paragraph_to_audio',
+    'paragraph_to_audio_stream',
     'normalize_text',
     'fine_tune_audio',
+    'audio_to_pcm16',
     'DEFAULT_SAMPLE_RATE',
     'DEFAUL_OUTPUT_FILE_NAME',
     'DEFAULT_OUTPUT_FILE_LENGTH'
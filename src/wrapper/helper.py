@@ -1,7 +1,9 @@
-import librosa
 import numpy as np
+from numba import njit
 
+import asyncio
 import re
+from functools import lru_cache
 from num2words import num2words
 
 from .model import XTTSWrapper
@@ -11,6 +13,30 @@ from wrapper.constants import DEFAULT_SAMPLE_RATE, DEFAUL_OUTPUT_FILE_NAME, DEFA
 import os
 
 
+# Post-processing and scheduling settings, read once at import
+# Silence to keep at the end of each sentence; 0.2s is better for short text
+_KEEP_SILENCE_DURATION = float(os.getenv('XTTS_KEEP_SILENCE_DURATION', '0.2'))
+# Max sentences of one paragraph in inference at once; XTTS keeps per-call
+# state on the GPT module, so only raise this if the model build in use is
+# known to tolerate concurrent inference calls
+_CONCURRENCY = int(os.getenv('XTTS_CONCURRENCY', '1'))
+# Max consecutive sentences with identical inference parameters decoded in one
+# GPT pass; 1 keeps the per-sentence Xtts.inference path
+_BATCH_SIZE = int(os.getenv('XTTS_BATCH_SIZE', '1'))
+
+
+# Vietnamese uses "." as the thousands separator, so dot-grouped numbers
+# (50.000, 1.234.567) are whole integers. Any other digit run is read as a
+# plain cardinal; other separators (e.g. the "." in "2.5") are left in place.
+_NUM_RE = re.compile(r"(?<!\d)\d{1,3}(?:\.\d{3})+(?!\d)|\d+")
+_HAS_DIGIT_RE = re.compile(r"\d")
+
+
+@lru_cache(maxsize=4096)
+def _n2w(token: str) -> str:
+    return num2words(int(token.replace('.', '')), lang='vi')
+
+
 def normalize_numbers(text: str):
     """Converts numerical digits in text to their Vietnamese word representation.
 
@@ -22,22 +48,45 @@ def normalize_numbers(text: str):
 
     Example:
         >>> normalize_numbers("Tôi có 2 con mèo")
-        "Tôi có hai con mèo"
+        'Tôi có hai con mèo'
+        >>> normalize_numbers("Giá 50.000 đồng")
+        'Giá năm mươi nghìn đồng'
+        >>> normalize_numbers("1.234.567")
+        'một triệu hai trăm ba mươi bốn nghìn năm trăm sáu mươi bảy'
     """
 
-    # Define patterns for different types of numbers
-    patterns = [
-        # Cardinal numbers (1, 2, 3, ...)
-        (r"(\d+)", lambda m: num2words(int(m.group(1)), lang='vi')),
-        # Decimal numbers (1.5, 2.7, ...)
-        (r"(\d+)\.(\d+)", lambda m: num2words(float(m.group(0)), lang='vi')),
-    ]
+    # Most sentences have no digits at all
+    if not _HAS_DIGIT_RE.search(text):
+        return text
 
-    # Apply patterns sequentially
-    for pattern, replacement_func in patterns:
-        text = re.sub(pattern, replacement_func, text)
+    return _NUM_RE.sub(lambda m: _n2w(m.group(0)), text)
 
-    return text
+
+@njit(cache=True, fastmath=True, boundscheck=False, nogil=True)
+def _find_last_loud_frame(audio, frame_length, hop_length, thresh_sq):
+    """Returns the index of the last frame whose sum-of-squares exceeds thresh_sq, or -1.
+
+    Frames start at multiples of hop_length. Audio shorter than one frame is
+    scanned as a single (shorter) frame.
+    """
+    n = len(audio)
+    frame = max(n - frame_length, 0) // hop_length
+    while frame >= 0:
+        start = frame * hop_length
+        end = min(start + frame_length, n)
+        s = 0.0
+        for j in range(start, end):
+            s += audio[j] * audio[j]
+        if s > thresh_sq:
+            return frame
+        frame -= 1
+    return -1
+
+
+# Compile for the dtypes XTTS produces at import time instead of on the first request
+for _dtype in (np.float32, np.float64):
+    _find_last_loud_frame(np.zeros(4, dtype=_dtype), 2, 1, 0.0)
+del _dtype
 
 
 def trim_silence(audio_data, sr, threshold=0.01, frame_length=2048, hop_length=512, keep_silence_duration=0.2):
@@ -56,15 +105,17 @@ def trim_silence(audio_data, sr, threshold=0.01, frame_length=2048, hop_length=5
         np.array: The trimmed audio signal as a NumPy array.
     """
 
-    # Compute the RMS energy of the audio signal.
-    rms = librosa.feature.rms(
-        y=audio_data, frame_length=frame_length, hop_length=hop_length)[0]
+    # Comparing sum-of-squares against threshold^2 * frame_length is
+    # equivalent to comparing RMS against threshold, without the sqrt.
+    thresh_sq = threshold ** 2 * frame_length
 
-    # Find the last frame where the RMS energy is above the threshold.
-    last_frame = np.where(rms > threshold)[0][-1]
+    # Scan frames backwards from the tail and stop at the first loud one, so
+    # only the trailing silence is touched instead of the whole signal.
+    last_frame = _find_last_loud_frame(
+        np.ascontiguousarray(audio_data), frame_length, hop_length, thresh_sq)
 
     # Convert the frame index to a sample index.
-    last_sample = librosa.frames_to_samples(last_frame, hop_length=hop_length)
+    last_sample = max(last_frame, 0) * hop_length
 
     # Calculate the number of samples to keep as silence.
     keep_silence_samples = int(keep_silence_duration * sr)
@@ -113,8 +164,8 @@ def fine_tune_audio(audio, **kwargs):
 
     sample_rate = kwargs.get("sample_rate", DEFAULT_SAMPLE_RATE)
 
-    # Get keep_silence_duration from env or use 0.2 as default (better for short text)
-    keep_silence = float(os.getenv('XTTS_KEEP_SILENCE_DURATION', '0.2'))
+    # Get keep_silence_duration from kwargs, then env, then 0.2 (better for short text)
+    keep_silence = kwargs.get("keep_silence_duration", _KEEP_SILENCE_DURATION)
     # audio_duration = len(audio) / sample_rate
     # if audio_duration < 2.0:
     #     keep_silence = 0.1
@@ -132,6 +183,30 @@ def fine_tune_audio(audio, **kwargs):
     return audio
 
 
+def audio_to_pcm16(audio):
+    """Quantizes float audio in [-1, 1] to 16-bit PCM.
+
+    Args:
+        audio (np.array): Float audio data.
+
+    Returns:
+        np.array: int16 audio data, ready to be written as a PCM16 WAV.
+    """
+    return np.clip(audio * 32767.0, -32768, 32767).astype(np.int16, copy=False)
+
+
+# Stands in for "..." while splitting; never appears in real text
+_ELLIPSIS_SENTINEL = "\x00"
+# Sentence end ([.!?] or ellipsis), optional closing quotes/parens, then whitespace
+_SENTENCE_BOUNDARY_RE = re.compile(
+    r"((?:\x00|[.!?])[\"'”’)\]]*)\s+")
+# Soft delimiters: comma, semicolon, colon, hyphen, en/em dash
+_SOFT_DELIM_RE = re.compile(r"([,;:\-\u2013\u2014])")
+# Vietnamese conjunctions that make good chunk boundaries
+_VI_CONJ = frozenset(["và", "nhưng", "hoặc", "rồi", "thì", "là", "nên",
+                      "vì", "bởi", "tuy", "dù"])
+
+
 def split_into_sentences(paragraph: str, max_len: int = 250, language: str = "vi"):
     """Split text into sentences and further chunk long sentences for model limits.
 
@@ -146,39 +221,26 @@ def split_into_sentences(paragraph: str, max_len: int = 250, language: str = "vi
 
     text = paragraph.strip()
 
-    # Normalize unicode ellipsis to three dots and protect ellipses with a token
-    text = text.replace("…", "...")
-    ELLIPSIS_TOKEN = "⟦ELLIPSIS⟧"
-    text = text.replace("...", ELLIPSIS_TOKEN)
+    # Normalize unicode ellipsis to three dots and protect ellipses with a
+    # single sentinel character so the boundary regex sees one code point
+    text = text.replace("…", "...").replace("...", _ELLIPSIS_SENTINEL)
 
-    # Base sentence split boundaries
-    boundary_pattern = r"(?:" + re.escape(ELLIPSIS_TOKEN) + \
-        r"|[.!?])(?:[\"'”’)\]]*)\s+"
+    # Base sentence split: the captured boundary (punctuation plus closing
+    # quotes/parens) lands at odd indices, sentence bodies at even indices
+    parts = _SENTENCE_BOUNDARY_RE.split(text)
+    boundaries = parts[1::2] + [""]
 
     base_sentences = []
-    start = 0
-    for match in re.finditer(boundary_pattern, text):
-        end = match.end()
-        chunk = text[start:end].strip()
+    for body, boundary in zip(parts[0::2], boundaries):
+        chunk = (body + boundary).strip()
         if chunk:
-            base_sentences.append(chunk.replace(ELLIPSIS_TOKEN, "..."))
-        start = end
-    tail = text[start:].strip()
-    if tail:
-        base_sentences.append(tail.replace(ELLIPSIS_TOKEN, "..."))
-
-    # Helper: finalize a buffer as a chunk
-    def flush(buffer_tokens):
-        chunk = " ".join(buffer_tokens).strip()
-        return chunk if chunk else None
+            base_sentences.append(
+                chunk.replace(_ELLIPSIS_SENTINEL, "..."))
 
     # Secondary split for long sentences
     chunks = []
-    # Soft delimiters and VN conjunction words for nicer splits
-    # comma, semicolon, colon, hyphen, en/em dash
-    soft_delims_regex = r"([,;:\-\u2013\u2014])"
-    vi_conj = set(["và", "nhưng", "hoặc", "rồi", "thì", "là", "nên",
-                  "vì", "bởi", "tuy", "dù"]) if language == "vi" else set()
+    # VN conjunction words for nicer splits
+    conjunctions = _VI_CONJ if language == "vi" else frozenset()
 
     for sent in base_sentences:
         sentence = sent.strip()
@@ -186,68 +248,66 @@ def split_into_sentences(paragraph: str, max_len: int = 250, language: str = "vi
             chunks.append(sentence)
             continue
 
-        # Pre-split on soft delimiters while keeping them
-        parts = re.split(soft_delims_regex, sentence)
-        # Re-attach delimiters to preceding tokens
-        merged = []
-        i = 0
-        while i < len(parts):
-            token = parts[i]
-            if i + 1 < len(parts) and re.fullmatch(soft_delims_regex, parts[i + 1] or ""):
-                token = (token or "") + (parts[i + 1] or "")
-                i += 2
-            else:
-                i += 1
-            if token:
-                merged.append(token.strip())
+        # Pre-split on soft delimiters and re-attach each delimiter to the
+        # preceding token. Length and soft-boundary status are computed once
+        # per token so the packing loop below does no string work.
+        parts = _SOFT_DELIM_RE.split(sentence)
+        tokens = []
+        for body, delim in zip(parts[0::2], parts[1::2] + [""]):
+            tok = (body + delim).strip()
+            if not tok:
+                continue
+            is_soft_boundary = (
+                tok.lower().strip(".,;:-—– ") in conjunctions
+                or (len(tok) == 1 and tok in ",;:-"))
+            tokens.append((tok, len(tok), is_soft_boundary))
 
         # Greedy pack tokens up to max_len, prefer to break after delimiters or conjunctions
         buffer = []
         current_len = 0
-
-        def smart_can_add(tok, cur_len):
-            return (cur_len + (1 if cur_len > 0 else 0) + len(tok)) <= max_len
-
-        for tok in merged:
-            tok_stripped = tok.strip()
-            if not tok_stripped:
+        last_is_soft = False
+
+        for tok, tok_len, is_soft_boundary in tokens:
+            new_len = current_len + (1 if current_len else 0) + tok_len
+            if new_len <= max_len:
+                buffer.append(tok)
+                current_len = new_len
+                last_is_soft = is_soft_boundary
                 continue
 
-            if smart_can_add(tok_stripped, current_len):
-                buffer.append(tok_stripped)
-                current_len += (1 if current_len > 0 else 0) + \
-                    len(tok_stripped)
-                continue
+            # Try to move a trailing soft boundary (conjunction or bare
+            # delimiter) to the next chunk to keep punctuation together.
+            carried = buffer.pop() if buffer and last_is_soft else None
 
-            # Try to move last buffer token to next chunk to keep punctuation together if needed
             if buffer:
-                last = buffer[-1]
-                last_word = last.lower().strip(".,;:-—– ")
-                if last_word in vi_conj or (len(last) == 1 and last in ",;:-"):
-                    # pop the last soft boundary for next chunk
-                    buffer.pop()
+                chunks.append(" ".join(buffer))
 
-            out = flush(buffer)
-            if out:
-                chunks.append(out)
+            buffer = [tok]
+            current_len = tok_len
+            if carried is not None:
+                if len(carried) + 1 + tok_len <= max_len:
+                    buffer.insert(0, carried)
+                    current_len += len(carried) + 1
+                else:
+                    chunks.append(carried)
+            last_is_soft = is_soft_boundary
 
-            buffer = [tok_stripped]
-            current_len = len(tok_stripped)
-
-        out = flush(buffer)
-        if out:
-            chunks.append(out)
+        if buffer:
+            chunks.append(" ".join(buffer))
 
     return chunks
 
 # refine-inference-param-cal1.md
 
+# Deletes the punctuation counted by calculate_inference_params
+_PUNCT_TABLE = str.maketrans('', '', ',.!?;:—-')
+
 
 def calculate_inference_params(text: str):
     """Calculate optimal inference parameters for xTTS based on text characteristics."""
     text = text.strip()
     text_len = len(text)
-    punctuation_count = sum(1 for c in text if c in ',.!?;:—-')
+    punctuation_count = text_len - len(text.translate(_PUNCT_TABLE))
     punctuation_density = punctuation_count / max(text_len, 1)
     words = text.lower().split()
     unique_words = len(set(words))
@@ -319,7 +379,7 @@ def split_text_smart(text: str):
     return sentences
 
 
-def paragraph_to_audio(model: XTTSWrapper, paragraph: str, language: str = "vi"):
+async def paragraph_to_audio(model: XTTSWrapper, paragraph: str, language: str = "vi"):
     """Converts a paragraph of text into a dictionary of audio segments for each sentence.
 
     Args:
@@ -328,18 +388,26 @@ def paragraph_to_audio(model: XTTSWrapper, paragraph: str, language: str = "vi")
 
     Returns:
         dict: A dictionary mapping sentence identifiers to audio data.
-              Keys are formatted as "index_sentence_text" and values are numpy arrays
-              containing the audio data for each sentence.
+              Keys are formatted as "index_sentence_text" and values are int16 numpy
+              arrays containing the PCM audio data for each sentence.
 
     Note:
         - Splits paragraph into sentences by period
         - Normalizes each sentence before processing
-        - Returns a dictionary where each key is "index_text" and value is the audio data
+        - Consecutive sentences with identical inference parameters are decoded
+          together in batches of up to XTTS_BATCH_SIZE (default 1, i.e. no batching)
+        - Runs model inference in worker threads, at most XTTS_CONCURRENCY at a time (default 1)
+        - Trimming of earlier sentences overlaps with inference of later ones
+        - Returns a dictionary where each key is "index_text" and value is the audio data,
+          in sentence order
         - Audio data is processed and fine-tuned (silence trimming, etc.)
     """
 
     sentences = split_into_sentences(paragraph, language=language)
-    audio_map = {}
+
+    # Normalize every sentence, then group consecutive sentences that share
+    # inference parameters into batches: (params, [(index, sentence, text)])
+    batches = []
     for index, sentence in enumerate(sentences):
         print(f"Processing Sentence {index}: {sentence}")
         text = sentence.strip()
@@ -350,26 +418,83 @@ def paragraph_to_audio(model: XTTSWrapper, paragraph: str, language: str = "vi")
         text = normalize_text(text)
 
         # Calculate inference parameters based on text characteristics
-        # inference_params = calculate_inference_params(text)
         inference_params = calculate_inference_params(text)
 
-        out_wav = model.inference(
-            text=text,
-            language=language,
-            **inference_params
-        )
+        if batches and batches[-1][0] == inference_params and len(batches[-1][1]) < _BATCH_SIZE:
+            batches[-1][1].append((index, sentence, text))
+        else:
+            batches.append((inference_params, [(index, sentence, text)]))
+
+    semaphore = asyncio.Semaphore(_CONCURRENCY)
+
+    # Fine tune and quantize the audio off the event loop, so the next batch
+    # can take the semaphore and start inference meanwhile
+    def postprocess(wav):
+        return audio_to_pcm16(
+            fine_tune_audio(wav, sample_rate=DEFAULT_SAMPLE_RATE))
+
+    async def synthesize(inference_params: dict, items: list):
+        async with semaphore:
+            if len(items) == 1:
+                out_wavs = [await asyncio.to_thread(
+                    model.inference,
+                    text=items[0][2],
+                    language=language,
+                    **inference_params
+                )]
+            else:
+                out_wavs = await asyncio.to_thread(
+                    model.inference_batch,
+                    [text for _, _, text in items],
+                    language,
+                    batch_size=_BATCH_SIZE,
+                    **inference_params
+                )
+
+        results = []
+        for (index, sentence, _), out_wav in zip(items, out_wavs):
+            tuned_audio = await asyncio.to_thread(postprocess, out_wav["wav"])
+
+            # Map the audio to its corresponding text
+            audio_name = f"{index}_{sentence[:DEFAULT_OUTPUT_FILE_LENGTH]}"
+            results.append((audio_name, tuned_audio))
+        return results
+
+    # gather() returns results in submission order, so the map stays in sentence order
+    results = await asyncio.gather(
+        *(synthesize(inference_params, items) for inference_params, items in batches))
 
-        # out_wav = model.inference(
-        #     text=text,
-        #     language=language,
-        # )
+    return dict(item for batch_results in results for item in batch_results)
+
+
+def paragraph_to_audio_stream(model: XTTSWrapper, paragraph: str, language: str = "vi"):
+    """Converts a paragraph of text into a stream of PCM16 audio chunks.
+
+    Args:
+        model (XTTSWrapper): The XTTS model wrapper instance to use for inference.
+        paragraph (str): A paragraph of text to convert to speech.
+        language (str): The language of the text.
 
-        # Fine tune the audio output
-        tuned_audio = fine_tune_audio(
-            out_wav["wav"], sample_rate=DEFAULT_SAMPLE_RATE)
+    Yields:
+        np.array: Consecutive int16 audio chunks covering every sentence, in order.
 
-        # Map the audio to its corresponding text
-        audio_name = f"{index}_{sentence[:DEFAULT_OUTPUT_FILE_LENGTH]}"
-        audio_map[audio_name] = tuned_audio
+    Note:
+        - Sentences are split, normalized and parameterized as in paragraph_to_audio
+        - Audio is yielded as soon as the model produces it, so trailing silence
+          is not trimmed
+    """
+
+    for index, sentence in enumerate(split_into_sentences(paragraph, language=language)):
+        print(f"Streaming Sentence {index}: {sentence}")
+        text = sentence.strip()
+        if not text:
+            continue
+
+        # Normalize text before procesing
+        text = normalize_text(text)
+
+        # Calculate inference parameters based on text characteristics
+        inference_params = calculate_inference_params(text)
 
-    return audio_map
+        for chunk in model.inference_stream(text=text, language=language, **inference_params):
+            yield audio_to_pcm16(chunk)
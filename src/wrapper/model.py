@@ -1,5 +1,11 @@
+import numpy as np
 import torch
+import torch.nn.functional as F
 import os
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 
 from TTS.tts.configs.xtts_config import XttsConfig
@@ -9,6 +15,13 @@ from TTS.tts.models.xtts import Xtts
 load_dotenv()
 
 
+def as_float32_wav(wav):
+    """Returns model audio as a contiguous float32 NumPy array, whatever XTTS handed back."""
+    if torch.is_tensor(wav):
+        wav = wav.detach().float().cpu().numpy()
+    return np.ascontiguousarray(wav, dtype=np.float32)
+
+
 class XTTSWrapper:
     def __init__(self, model_dir: str, audio_path: str):
         """
@@ -27,6 +40,25 @@ class XTTSWrapper:
         if torch.cuda.is_available():
             self.model.cuda()
 
+        # Mixed precision for inference on GPU (XTTS_AUTOCAST):
+        #   bf16 - bf16 on GPUs that support it (Ampere+), full precision otherwise
+        #   fp16 - fp16 on any GPU (changes numerics more than bf16)
+        #   off  - always full precision
+        autocast_mode = os.getenv('XTTS_AUTOCAST', 'bf16').lower()
+        if autocast_mode not in ('bf16', 'fp16', 'off'):
+            raise ValueError(
+                f"XTTS_AUTOCAST must be one of bf16, fp16, off; got {autocast_mode!r}")
+        self.use_autocast = torch.cuda.is_available() and (
+            autocast_mode == 'fp16'
+            or (autocast_mode == 'bf16' and torch.cuda.is_bf16_supported()))
+        self.autocast_dtype = torch.bfloat16 if autocast_mode == 'bf16' else torch.float16
+        print(f"XTTS Autocast: {self.autocast_dtype if self.use_autocast else 'off'}")
+        if self.use_autocast:
+            # Xtts.inference calls .numpy() on the vocoder output, which fails
+            # for bf16 tensors, so hand it back in fp32
+            self.model.hifigan_decoder.register_forward_hook(
+                lambda module, args, output: output.float())
+
         # Load inference parameters from environment variables with model config as fallback
         self.temperature = float(os.getenv(
             'XTTS_TEMPERATURE', self.config.temperature))
@@ -37,6 +69,11 @@ class XTTSWrapper:
         self.top_k = int(os.getenv('XTTS_TOP_K', self.config.top_k))
         self.top_p = float(os.getenv(
             'XTTS_TOP_P', self.config.top_p))
+        # Additional parameters that significantly affect quality
+        self.do_sample = os.getenv('XTTS_DO_SAMPLE', 'True').lower() == 'true'
+        self.speed = float(os.getenv('XTTS_SPEED', '1.0'))
+        self.enable_text_splitting = os.getenv(
+            'XTTS_ENABLE_TEXT_SPLITTING', 'True').lower() == 'true'
 
         print(f"XTTS Model Parameters:")
         print(f"  Temperature: {self.temperature}")
@@ -44,9 +81,40 @@ class XTTSWrapper:
         print(f"  Repetition Penalty: {self.repetition_penalty}")
         print(f"  Top K: {self.top_k}")
         print(f"  Top P: {self.top_p}")
+        print(f"  Do Sample: {self.do_sample}")
+        print(f"  Speed: {self.speed}")
+        print(f"  Enable Text Splitting: {self.enable_text_splitting}")
+
+        # LRU cache of synthesized audio for repeated (text, params) requests
+        self._cache = OrderedDict()
+        self._cache_max = int(os.getenv('XTTS_CACHE_SIZE', '256'))
+        self._cache_lock = threading.Lock()
+
+        # Process-wide bound on concurrent model calls. Requests are served from
+        # several threads, and XTTS keeps per-call state on the GPT module.
+        self._inference_slots = threading.BoundedSemaphore(
+            int(os.getenv('XTTS_CONCURRENCY', '1')))
 
         self.get_conditioning_latents(audio_path)
 
+        # Optionally compile the GPT decoder (XTTS_COMPILE=1). The autoregressive
+        # loop runs through gpt_inference.transformer, which shares the GPT2
+        # model with gpt.gpt, so both references point at the compiled module.
+        # CUDA-graph modes ("reduce-overhead") are avoided on purpose: their
+        # state is per-thread, while inference runs on worker threads, and the
+        # KV-cache length changes every decode step, forcing re-recording.
+        if os.getenv('XTTS_COMPILE', '0') == '1' and hasattr(self.model, 'gpt'):
+            print("Compiling XTTS GPT decoder...")
+            compiled_gpt = torch.compile(
+                self.model.gpt.gpt, mode='default', dynamic=True)
+            self.model.gpt.gpt = compiled_gpt
+            if getattr(self.model.gpt, 'gpt_inference', None) is not None:
+                self.model.gpt.gpt_inference.transformer = compiled_gpt
+
+            # Trigger compilation now rather than on the first request
+            warmup_language = "vi" if "vi" in self.config.languages else self.config.languages[0]
+            self.inference("Xin chào bạn.", warmup_language)
+
     def get_config(self):
         return self.config
 
@@ -68,6 +136,16 @@ class XTTSWrapper:
             sound_norm_refs=bool(self.model.config.sound_norm_refs),
         )
 
+        # Keep the latents resident on the model's device so Xtts.inference's
+        # own .to(device) calls are no-ops instead of per-sentence copies
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.model_gpt_cond_latent = self.model_gpt_cond_latent.to(
+            device, non_blocking=True).contiguous()
+        self.model_speaker_embedding = self.model_speaker_embedding.to(
+            device, non_blocking=True).contiguous()
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+
         return self.model_gpt_cond_latent, self.model_speaker_embedding
 
     def inference(self, text: str, language: str, **kwargs):
@@ -81,8 +159,17 @@ class XTTSWrapper:
 
         Returns:
             Dict[str, Any]: The inference results, including the synthesized audio as a NumPy array under the key "wav".
+                Cache hits only contain "wav". Cached audio is read-only; copy it before editing in place.
+
+        Note:
+            Results are cached (up to XTTS_CACHE_SIZE entries) when the output is
+            deterministic: do_sample is False, or a "seed" keyword is given. Calls
+            with custom conditioning latents are never cached.
         """
 
+        custom_conditioning = "gpt_cond_latent" in kwargs or "speaker_embedding" in kwargs
+        seed = kwargs.pop("seed", None)
+
         # Use default values if not provided in kwargs
         # torch.Tensor
         gpt_cond_latent = kwargs.pop(
@@ -99,28 +186,268 @@ class XTTSWrapper:
         top_p = kwargs.pop("top_p", self.top_p)
 
         # Additional parameters that significantly affect quality
-        # Load from environment variables with defaults
-        do_sample = kwargs.pop("do_sample", os.getenv(
-            'XTTS_DO_SAMPLE', 'True').lower() == 'true')
-        speed = kwargs.pop("speed", float(os.getenv('XTTS_SPEED', '1.0')))
+        do_sample = kwargs.pop("do_sample", self.do_sample)
+        speed = kwargs.pop("speed", self.speed)
         enable_text_splitting = kwargs.pop(
-            "enable_text_splitting", os.getenv('XTTS_ENABLE_TEXT_SPLITTING', 'True').lower() == 'true')
+            "enable_text_splitting", self.enable_text_splitting)
 
         print(
             f"Inference Parameters: temperature: {temperature}, length_penalty: {length_penalty}, repetition_penalty: {repetition_penalty}, top_k: {top_k}, top_p: {top_p}, do_sample: {do_sample}, speed: {speed}, enable_text_splitting: {enable_text_splitting}")
 
-        return self.model.inference(
+        cache_key = None
+        if self._cache_max > 0 and not custom_conditioning and (not do_sample or seed is not None):
+            cache_key = hashlib.md5(repr((
+                text, language, speed, temperature, top_k, top_p, length_penalty,
+                repetition_penalty, do_sample, seed, enable_text_splitting,
+                sorted(kwargs.items()))).encode()).digest()
+            with self._cache_lock:
+                if cache_key in self._cache:
+                    self._cache.move_to_end(cache_key)
+                    return {"wav": self._cache[cache_key]}
+
+        with self._inference_slots, torch.inference_mode(), torch.autocast(
+                device_type='cuda', dtype=self.autocast_dtype, enabled=self.use_autocast):
+            if seed is not None:
+                torch.manual_seed(seed)
+
+            result = self.model.inference(
+                text=text,
+                language=language,
+                gpt_cond_latent=gpt_cond_latent,
+                speaker_embedding=speaker_embedding,
+                temperature=temperature,
+                length_penalty=length_penalty,
+                repetition_penalty=repetition_penalty,
+                top_k=top_k,
+                top_p=top_p,
+                do_sample=do_sample,
+                speed=speed,
+                enable_text_splitting=enable_text_splitting,
+                **kwargs,
+            )
+
+        # Normalize once here so trimming, quantization and caching never
+        # re-cast or copy the audio downstream
+        result["wav"] = as_float32_wav(result["wav"])
+
+        if cache_key is not None:
+            # The same array is handed out on every hit, so freeze it to stop
+            # in-place edits by one caller from corrupting the cache
+            result["wav"].flags.writeable = False
+            with self._cache_lock:
+                self._cache[cache_key] = result["wav"]
+                self._cache.move_to_end(cache_key)
+                while len(self._cache) > self._cache_max:
+                    self._cache.popitem(last=False)
+
+        return result
+
+    def inference_batch(self, texts: list, language: str, batch_size: int = 4, **kwargs):
+        """
+        Performs inference on several texts, decoding up to batch_size of them in a single GPT pass.
+
+        The prompts are left-padded with an attention mask so every sample starts
+        generating audio codes at the same position, and each sample stops at its
+        own stop token. GPT latents and the vocoder are then run per sample, exactly
+        as Xtts.inference does. All texts share the same generation parameters.
+
+        Args:
+            texts (List[str]): The texts to synthesize, one sentence each (no text splitting is applied).
+            language (str): The language of the texts.
+            batch_size (int): The maximum number of texts decoded together.
+            **kwargs: Generation parameters, as for inference(). Custom conditioning latents are not supported.
+
+        Returns:
+            List[Dict[str, Any]]: One result per text, in order, each with the synthesized audio under the key "wav".
+                Results are not cached.
+        """
+
+        if batch_size <= 1 or len(texts) <= 1:
+            return [self.inference(text, language, **dict(kwargs)) for text in texts]
+
+        seed = kwargs.pop("seed", None)
+        kwargs.pop("enable_text_splitting", None)
+        generate_kwargs = {
+            "temperature": kwargs.pop("temperature", self.temperature),
+            "length_penalty": kwargs.pop("length_penalty", self.length_penalty),
+            "repetition_penalty": kwargs.pop(
+                "repetition_penalty", self.repetition_penalty),
+            "top_k": kwargs.pop("top_k", self.top_k),
+            "top_p": kwargs.pop("top_p", self.top_p),
+            "do_sample": kwargs.pop("do_sample", self.do_sample),
+        }
+        speed = kwargs.pop("speed", self.speed)
+
+        print(
+            f"Batch Inference Parameters: batch_size: {batch_size}, {generate_kwargs}, speed: {speed}")
+
+        results = []
+        with self._inference_slots, torch.inference_mode(), torch.autocast(
+                device_type='cuda', dtype=self.autocast_dtype, enabled=self.use_autocast):
+            if seed is not None:
+                torch.manual_seed(seed)
+
+            for start in range(0, len(texts), batch_size):
+                results.extend(self._inference_batch(
+                    texts[start:start + batch_size], language, speed, **generate_kwargs, **kwargs))
+
+        return results
+
+    def _inference_batch(self, texts: list, language: str, speed: float, **generate_kwargs):
+        """Synthesizes one batch of texts; see inference_batch()."""
+        gpt = self.model.gpt
+        language = language.split("-")[0]
+        cond_latent = self.model_gpt_cond_latent
+        device = cond_latent.device
+
+        # Build each prompt like GPT.compute_embeddings: conditioning latents
+        # followed by [start_text] text [stop_text]
+        text_tokens = []
+        prompts = []
+        for text in texts:
+            tokens = torch.IntTensor(self.model.tokenizer.encode(
+                text.strip().lower(), lang=language)).unsqueeze(0).to(device)
+            # Same limit Xtts.inference enforces; longer prompts overrun the
+            # text position embeddings
+            assert tokens.shape[-1] < self.model.args.gpt_max_text_tokens, \
+                f"XTTS can only generate text with a maximum of {self.model.args.gpt_max_text_tokens} tokens: {text!r}"
+            text_tokens.append(tokens)
+            padded = F.pad(tokens, (0, 1), value=gpt.stop_text_token)
+            padded = F.pad(padded, (1, 0), value=gpt.start_text_token)
+            emb = gpt.text_embedding(padded) + gpt.text_pos_embedding(padded)
+            prompts.append(torch.cat([cond_latent, emb], dim=1))
+
+        # Left-pad the prompts so the start_audio token lines up for every sample
+        prompt_len = max(prompt.shape[1] for prompt in prompts)
+        prefix = prompts[0].new_zeros(
+            (len(prompts), prompt_len, prompts[0].shape[-1]))
+        attention_mask = torch.zeros(
+            (len(prompts), prompt_len + 1), dtype=torch.long, device=device)
+        for i, prompt in enumerate(prompts):
+            prefix[i, prompt_len - prompt.shape[1]:] = prompt[0]
+            attention_mask[i, prompt_len - prompt.shape[1]:] = 1
+
+        gpt.gpt_inference.store_prefix_emb(prefix)
+        gpt_inputs = torch.full(
+            (len(prompts), prompt_len + 1), fill_value=1, dtype=torch.long, device=device)
+        gpt_inputs[:, -1] = gpt.start_audio_token
+
+        codes = gpt.gpt_inference.generate(
+            gpt_inputs,
+            attention_mask=attention_mask,
+            bos_token_id=gpt.start_audio_token,
+            pad_token_id=gpt.stop_audio_token,
+            eos_token_id=gpt.stop_audio_token,
+            max_length=gpt.max_gen_mel_tokens + gpt_inputs.shape[-1],
+            num_return_sequences=1,
+            num_beams=1,
+            output_attentions=False,
+            **generate_kwargs,
+        )[:, gpt_inputs.shape[1]:]
+
+        length_scale = 1.0 / max(speed, 0.05)
+        results = []
+        for tokens, sample_codes in zip(text_tokens, codes):
+            # Keep the codes up to and including this sample's own stop token
+            stops = (sample_codes == gpt.stop_audio_token).nonzero()
+            if len(stops):
+                sample_codes = sample_codes[:stops[0, 0] + 1]
+            sample_codes = sample_codes.unsqueeze(0)
+
+            expected_output_len = torch.tensor(
+                [sample_codes.shape[-1] * gpt.code_stride_len], device=device)
+            text_len = torch.tensor([tokens.shape[-1]], device=device)
+            gpt_latents = gpt(
+                tokens,
+                text_len,
+                sample_codes,
+                expected_output_len,
+                cond_latents=cond_latent,
+                return_attentions=False,
+                return_latent=True,
+            )
+            if length_scale != 1.0:
+                gpt_latents = F.interpolate(
+                    gpt_latents.transpose(1, 2), scale_factor=length_scale, mode="linear").transpose(1, 2)
+
+            wav = self.model.hifigan_decoder(
+                gpt_latents, g=self.model_speaker_embedding)
+            results.append({"wav": as_float32_wav(wav.squeeze())})
+
+        return results
+
+    def inference_stream(self, text: str, language: str, **kwargs):
+        """
+        Performs streaming inference on the given text, yielding audio as it is generated.
+
+        Wraps Xtts.inference_stream, which runs the vocoder on every stream_chunk_size
+        GPT tokens and cross-fades consecutive chunks, so the first audio is available
+        long before the whole sentence has been decoded.
+
+        Args:
+            text (str): The text to synthesize.
+            language (str): The language of the text.
+            **kwargs: Additional keyword arguments for the inference, as for inference(),
+                plus stream_chunk_size (GPT tokens per chunk, default 20).
+
+        Yields:
+            np.ndarray: Consecutive float32 audio chunks.
+
+        Note:
+            The model runs in a background thread that holds an inference slot
+            (XTTS_CONCURRENCY) only while generating; chunks are buffered until the
+            consumer reads them, so a slow client does not block other requests.
+            Closing the generator stops generation at the next chunk. Streamed audio
+            is not cached.
+        """
+
+        stream = self.model.inference_stream(
             text=text,
             language=language,
-            gpt_cond_latent=gpt_cond_latent,
-            speaker_embedding=speaker_embedding,
-            temperature=temperature,
-            length_penalty=length_penalty,
-            repetition_penalty=repetition_penalty,
-            top_k=top_k,
-            top_p=top_p,
-            do_sample=do_sample,
-            speed=speed,
-            enable_text_splitting=enable_text_splitting,
+            gpt_cond_latent=kwargs.pop(
+                "gpt_cond_latent", self.model_gpt_cond_latent),
+            speaker_embedding=kwargs.pop(
+                "speaker_embedding", self.model_speaker_embedding),
+            temperature=kwargs.pop("temperature", self.temperature),
+            length_penalty=kwargs.pop("length_penalty", self.length_penalty),
+            repetition_penalty=kwargs.pop(
+                "repetition_penalty", self.repetition_penalty),
+            top_k=kwargs.pop("top_k", self.top_k),
+            top_p=kwargs.pop("top_p", self.top_p),
+            do_sample=kwargs.pop("do_sample", self.do_sample),
+            speed=kwargs.pop("speed", self.speed),
+            enable_text_splitting=kwargs.pop(
+                "enable_text_splitting", self.enable_text_splitting),
             **kwargs,
         )
+
+        chunks = queue.Queue()
+        stop = threading.Event()
+
+        def produce():
+            # The slot is held only while the model runs; chunks go to an
+            # unbounded queue so a slow client never keeps the slot busy
+            try:
+                with self._inference_slots, torch.autocast(
+                        device_type='cuda', dtype=self.autocast_dtype, enabled=self.use_autocast):
+                    for chunk in stream:
+                        if stop.is_set():
+                            break
+                        chunks.put(as_float32_wav(chunk))
+            except BaseException as e:  # noqa: BLE001 - forward every failure to the consumer
+                chunks.put(e)
+            finally:
+                chunks.put(None)
+
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                yield chunk
+        finally:
+            # Let the producer release its slot early if the client went away
+            stop.set()